@@ -1,5 +1,5 @@
 """OpenAI client wrapper for AI processing."""
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 import json
 import yaml
 from pathlib import Path
@@ -15,6 +15,7 @@ class OpenAIClient:
     def __init__(self):
         """Initialize the OpenAI client."""
         self._client = None
+        self._prompt_cache: Optional[Tuple[Dict[str, Any], str]] = None
         self._load_workflow_config()
         if not config.openai_api_key:
             logger.warning("OpenAI API key not configured, using mock responses")
@@ -203,6 +204,16 @@ Please format this into a helpful, user-friendly response. Extract the key infor
             self.flow_config = {"workflows": []}
     
     def _build_classification_prompt(self) -> str:
+        """Return the classification prompt, rebuilt only when flow_config is replaced."""
+        # Cache keyed on the config object itself; reassigning flow_config invalidates it
+        if self._prompt_cache and self._prompt_cache[0] is self.flow_config:
+            return self._prompt_cache[1]
+        
+        prompt = self._build_classification_prompt_uncached()
+        self._prompt_cache = (self.flow_config, prompt)
+        return prompt
+    
+    def _build_classification_prompt_uncached(self) -> str:
         """Build classification prompt dynamically from workflow configuration."""
         # Extract unique classification types from workflows
         classification_types = set()
@@ -14,6 +14,12 @@ from src.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Slack markup patterns, compiled once at import
+_MENTION_RE = re.compile(r'<@[A-Z0-9]+>')
+_CHANNEL_RE = re.compile(r'<#[A-Z0-9]+\|[^>]+>')
+_LINK_RE = re.compile(r'<[^|]+\|([^>]+)>')
+_WHITESPACE_RE = re.compile(r'\s+')
+
 
 class SlackAdapter(ChannelAdapter):
     """Slack-specific implementation of the channel adapter."""
@@ -81,7 +87,7 @@ class SlackAdapter(ChannelAdapter):
             
             if event_type == "event_callback":
                 event = request["event"]
-                if event["type"] == "message" and not event.get("subtype"):
+                if self._should_process(event):
                     logger.info("Processing message event",
                               channel=event.get("channel"),
                               user=event.get("user"),
@@ -94,7 +100,17 @@ class SlackAdapter(ChannelAdapter):
                            event_type=event_type,
                            error=str(e))
             raise
-    
+
+    async def _handle_message_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize a Slack message event into a parsed context."""
+        parsed_context = self._parse_slack_event(event)
+
+        return {
+            "parsed_context": parsed_context,
+            "is_thread_reply": bool(event.get("thread_ts")),
+            "event_type": event.get("type")
+        }
+
     async def start_socket_mode(self, message_processor):
         """Start Socket Mode client if configured."""
         if not config.slack_app_token:
@@ -118,14 +134,7 @@ class SlackAdapter(ChannelAdapter):
                     
                     # Process the event
                     event = req.payload["event"]
-                    if event["type"] == "message" and not event.get("subtype"):
-                        # Ignore messages from the bot itself
-                        if event.get("user") == self.bot_id:
-                            logger.debug("Ignoring message from bot itself", 
-                                       bot_id=self.bot_id,
-                                       user_id=event.get("user"))
-                            return
-                            
+                    if self._should_process(event):
                         logger.info("Received message via Socket Mode",
                                   channel=event.get("channel"),
                                   user=event.get("user"),
@@ -181,6 +190,20 @@ class SlackAdapter(ChannelAdapter):
             logger.exception("Fatal error in Socket Mode connection", error=str(e))
             raise
     
+    def _should_process(self, event: Dict[str, Any]) -> bool:
+        """Check whether an event is a plain user message the bot should answer."""
+        if event.get("type") != "message" or event.get("subtype"):
+            return False
+        
+        # Ignore messages from the bot itself
+        if self.bot_id and event.get("user") == self.bot_id:
+            logger.debug("Ignoring message from bot itself", 
+                       bot_id=self.bot_id,
+                       user_id=event.get("user"))
+            return False
+        
+        return True
+    
     def get_channel_type(self) -> str:
         """Return channel type identifier."""
         return "slack"
@@ -205,20 +228,20 @@ class SlackAdapter(ChannelAdapter):
     def _is_bot_mention(self, text: str) -> bool:
         """Check if the message mentions the bot."""
         # Clean up Slack's <@USER_ID> format
-        return bool(re.search(r'<@[A-Z0-9]+>', text))
+        return bool(_MENTION_RE.search(text))
     
     def _clean_slack_message(self, text: str) -> str:
         """Clean Slack-specific formatting from message text."""
         # Remove user mentions like <@U123456>
-        text = re.sub(r'<@[A-Z0-9]+>', '', text)
+        text = _MENTION_RE.sub('', text)
         
         # Remove channel mentions like <#C123456|general>
-        text = re.sub(r'<#[A-Z0-9]+\|[^>]+>', '', text)
+        text = _CHANNEL_RE.sub('', text)
         
         # Remove URLs like <http://example.com|example.com>
-        text = re.sub(r'<[^|]+\|([^>]+)>', r'\1', text)
+        text = _LINK_RE.sub(r'\1', text)
         
         # Clean up extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WHITESPACE_RE.sub(' ', text).strip()
         
         return text
\ No newline at end of file
@@ -3,9 +3,11 @@ import time
 import json
 import uuid
 import yaml
+from collections import defaultdict, deque
 from pathlib import Path
-from typing import Dict, Any, Optional, TYPE_CHECKING
+from typing import Deque, Dict, Any, Optional, TYPE_CHECKING
 from src.data.models import MessageContext, ProcessingResult
+from src.utils.config import config
 from src.utils.logging import get_logger
 from src.ai.openai_client import OpenAIClient
 
@@ -51,13 +53,14 @@ class MessageProcessor:
         """Initialize processor with necessary components."""
         logger.info("Initializing MessageProcessor")
         self._openai_client = OpenAIClient()
-        self.conversation_context: Dict[str, list] = {}
+        # Last 10 messages per conversation; deque drops the oldest on append
+        self.conversation_context: Dict[str, Deque[dict]] = defaultdict(lambda: deque(maxlen=10))
         self._load_workflows()
         
         # Initialize knowledge base if available
         if KNOWLEDGE_BASE_AVAILABLE and KnowledgeBaseManager is not None:
             try:
-                self.knowledge_base = KnowledgeBaseManager()
+                self.knowledge_base = KnowledgeBaseManager(persist_directory=config.chroma_persist_directory)
                 logger.info("Knowledge base manager initialized in MessageProcessor")
             except Exception as e:
                 logger.error("Failed to initialize knowledge base manager", error=str(e))
@@ -128,16 +131,16 @@ class MessageProcessor:
                 error_message=str(e)
             )
     
-    def _get_conversation_context(self, context: MessageContext) -> list:
+    def _get_conversation_context(self, context: MessageContext) -> Deque[dict]:
         """Get conversation history for context."""
         if context.thread_ts:
             key = f"{context.channel_id}:{context.thread_ts}"
         else:
             key = f"{context.channel_id}:{context.user_id}"
             
-        return self.conversation_context.get(key, [])
+        return self.conversation_context.get(key, deque())
     
-    async def _classify_message(self, ai_client, context: MessageContext, history: list) -> Dict[str, Any]:
+    async def _classify_message(self, ai_client, context: MessageContext, history: Deque[dict]) -> Dict[str, Any]:
         """Classify message using AI."""
         try:
             # Build prompt with context
@@ -166,7 +169,7 @@ class MessageProcessor:
             logger.error("AI classification failed", error=str(e))
             raise
     
-    def _build_classification_prompt(self, context: MessageContext, history: list) -> str:
+    def _build_classification_prompt(self, context: MessageContext, history: Deque[dict]) -> str:
         """Build prompt for AI classification."""
         base_prompt = """
         Classify this message and respond with JSON only:
@@ -180,7 +183,7 @@ class MessageProcessor:
         """.format(
             message=context.message_text,
             channel_type=context.channel_type,
-            history=history[-3:] if history else "None"  # Last 3 messages for context
+            history=list(history)[-3:] if history else "None"  # Last 3 messages for context
         )
         
         return base_prompt.strip()
@@ -387,16 +390,9 @@ class MessageProcessor:
         else:
             key = f"{context.channel_id}:{context.user_id}"
             
-        if key not in self.conversation_context:
-            self.conversation_context[key] = []
-            
         self.conversation_context[key].append({
             "user_message": context.message_text,
             "classification": classification,
             "bot_response": response,
             "timestamp": time.time()
-        })
-        
-        # Keep only last 10 messages per conversation
-        if len(self.conversation_context[key]) > 10:
-            self.conversation_context[key] = self.conversation_context[key][-10:]
\ No newline at end of file
+        })
\ No newline at end of file
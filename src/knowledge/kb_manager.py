@@ -1,62 +1,244 @@
 """Knowledge Base Manager using ChromaDB for vector search."""
+import itertools
 import os
+import threading
 import uuid
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Tuple, cast
 
 import chromadb
+import numpy as np
+from numpy.typing import ArrayLike
+from chromadb.api.models.Collection import Collection
+from chromadb.api.types import Embeddable, EmbeddingFunction, PyEmbeddings, QueryResult, Where
 from chromadb.utils import embedding_functions
 
 from src.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Number of distinct (query, max_results, threshold) searches kept per manager
+_SEARCH_CACHE_SIZE = 1000
+
+# Query embeddings kept for the semantic cache, and how close a new query must be to reuse one
+_SEMANTIC_CACHE_SIZE = 128
+_SEMANTIC_CACHE_SIMILARITY = 0.86
+
+# Document ids are a per-process random prefix plus a counter, so only one uuid4 is drawn
+_ID_PREFIX = f"{uuid.uuid4().hex}-"
+_id_counter = itertools.count()
+
+
+def _next_document_id() -> str:
+    """Return a new document id, unique across processes sharing a collection."""
+    return f"{_ID_PREFIX}{next(_id_counter)}"
+
+
+# Collection metadata; cosine space makes ``1 - distance`` a true cosine similarity,
+# and the HNSW settings trade a slower build for faster, more accurate queries.
+# ChromaDB ignores this for existing collections, so those are rebuilt at startup
+# when they were created with another distance space (see _ensure_cosine_space)
+_COLLECTION_METADATA = {
+    "description": "AI OnCall knowledge base documents",
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 100,
+    "hnsw:M": 16,
+}
+
+# Upper bound on documents per insert during a directory load; ChromaDB's own
+# max batch size still applies, and a failing batch only loses its own files
+_BULK_ADD_BATCH_SIZE = 500
+
+# Documents at least this similar to an existing one are not stored again
+_DUPLICATE_SIMILARITY_THRESHOLD = 0.86
+
+# Loading the embedding model is slow, so every manager shares one instance
+_EMBED_FN_CACHE: Optional[EmbeddingFunction[Embeddable]] = None
+_EMBED_FN_LOCK = threading.Lock()
+
+
+def _get_embedding_function() -> EmbeddingFunction[Embeddable]:
+    """Return the shared default embedding function, creating it on first use."""
+    global _EMBED_FN_CACHE
+    if _EMBED_FN_CACHE is None:
+        with _EMBED_FN_LOCK:
+            if _EMBED_FN_CACHE is None:
+                # Collections are typed to take any embeddable input, not only documents
+                _EMBED_FN_CACHE = cast(EmbeddingFunction[Embeddable], embedding_functions.DefaultEmbeddingFunction())
+    return _EMBED_FN_CACHE
+
+
+def _unit_rows(vectors: ArrayLike) -> np.ndarray:
+    """Stack vectors into a matrix of unit-length rows (zero rows are left as-is)."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
 
 class KnowledgeBaseManager:
     """Manages ChromaDB operations for knowledge base search."""
     
+    # One manager (and ChromaDB client) per persisted collection
+    _INSTANCES: Dict[Tuple[str, str], "KnowledgeBaseManager"] = {}
+    _INSTANCES_LOCK = threading.Lock()
+    
+    # Set per instance in __new__, so __init__ runs once per shared manager
+    _initialized: bool
+    _init_lock: threading.Lock
+    
+    def __new__(cls, persist_directory: str = "chroma_db", collection_name: str = "knowledge_base") -> "KnowledgeBaseManager":
+        """Return the existing manager for this collection, creating it if needed."""
+        key = (persist_directory, collection_name)
+        with cls._INSTANCES_LOCK:
+            instance = cls._INSTANCES.get(key)
+            if instance is None:
+                instance = super().__new__(cls)
+                instance._initialized = False
+                instance._init_lock = threading.Lock()
+                cls._INSTANCES[key] = instance
+        return instance
+    
     def __init__(self, persist_directory: str = "chroma_db", collection_name: str = "knowledge_base"):
         """Initialize ChromaDB client and collection."""
-        self.persist_directory = persist_directory
-        self.collection_name = collection_name
-        
-        # Initialize ChromaDB client with persistence
-        self.client = chromadb.PersistentClient(path=persist_directory)
-        
-        # Initialize embedding function - using default for simplicity
-        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
-        
-        # Create or get the collection
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
+        with self._init_lock:
+            if self._initialized:
+                return
+            
+            self.persist_directory = persist_directory
+            self.collection_name = collection_name
+            self._search_cache: "OrderedDict[Tuple[str, int, float], List[Dict[str, Any]]]" = OrderedDict()
+            self._semantic_cache: "OrderedDict[Tuple[str, int, float], Tuple[np.ndarray, List[Dict[str, Any]]]]" = OrderedDict()
+            
+            # Initialize ChromaDB client with persistence
+            self.client = chromadb.PersistentClient(path=persist_directory)
+            
+            # Initialize embedding function - using default for simplicity
+            self.embedding_function = _get_embedding_function()
+            
+            # Create or get the collection
+            self._finish_interrupted_rebuild()
+            self.collection = self._get_or_create_collection(collection_name)
+            self._ensure_cosine_space()
+            self._initialized = True
+            
+            logger.info("ChromaDB initialized", 
+                       persist_directory=persist_directory,
+                       collection_name=collection_name)
+    
+    def _get_or_create_collection(self, name: str) -> Collection:
+        """Get or create a collection with the knowledge base's embedding function and metadata."""
+        return self.client.get_or_create_collection(
+            name=name,
             embedding_function=self.embedding_function,
-            metadata={"description": "AI OnCall knowledge base documents"}
+            metadata=_COLLECTION_METADATA
         )
-        
-        logger.info("ChromaDB initialized", 
-                   persist_directory=persist_directory,
-                   collection_name=collection_name)
     
-    def add_document(self, text: str, source: str, filepath: Optional[str] = None) -> str:
-        """Add a single document to the knowledge base."""
-        document_id = str(uuid.uuid4())
-        metadata = {
-            "source": source,
-            "filepath": filepath or source
-        }
+    def _collection_space(self) -> str:
+        """Return the distance space the collection was actually created with."""
+        hnsw = (self.collection.configuration or {}).get("hnsw") or {}
+        return str(hnsw.get("space") or (self.collection.metadata or {}).get("hnsw:space", "l2"))
+    
+    def _finish_interrupted_rebuild(self) -> None:
+        """Complete a cosine rebuild that stopped between its renames (see _ensure_cosine_space)."""
+        rebuilt_name = f"{self.collection_name}-cosine"
+        previous_name = f"{self.collection_name}-previous"
+        try:
+            names = {collection.name for collection in self.client.list_collections()}
+            if previous_name not in names:
+                return
+            
+            # The copy is complete once the original has been moved aside, so adopt it
+            if self.collection_name not in names:
+                self.client.get_collection(
+                    name=rebuilt_name,
+                    embedding_function=self.embedding_function
+                ).modify(name=self.collection_name)
+            self.client.delete_collection(name=previous_name)
+            
+            logger.warning("Finished interrupted knowledge base rebuild",
+                          collection=self.collection_name)
+            
+        except Exception as e:
+            logger.error("Failed to finish interrupted knowledge base rebuild",
+                        collection=self.collection_name,
+                        error=str(e))
+    
+    def _ensure_cosine_space(self) -> None:
+        """Rebuild a collection created with a non-cosine distance space as a cosine one.
         
+        Similarity scores, the duplicate threshold and the semantic cache all assume
+        ``1 - distance`` is a cosine similarity. Stored embeddings are copied as-is,
+        so nothing is re-embedded. The original is only dropped once the copy has
+        taken its name; _finish_interrupted_rebuild completes a rebuild cut short.
+        """
+        rebuilt_name = f"{self.collection_name}-cosine"
+        previous_name = f"{self.collection_name}-previous"
+        previous_space = "unknown"
         try:
-            self.collection.add(
-                documents=[text],
-                metadatas=[metadata],
-                ids=[document_id]
-            )
+            previous_space = self._collection_space()
+            if previous_space == "cosine":
+                return
+            
+            logger.warning("Rebuilding knowledge base collection with cosine distance",
+                          collection=self.collection_name,
+                          previous_space=previous_space,
+                          document_count=self.collection.count())
+            
+            # Drop a partial copy left behind by a rebuild interrupted while copying
+            try:
+                self.client.delete_collection(name=rebuilt_name)
+            except Exception:
+                pass
+            rebuilt = self._get_or_create_collection(rebuilt_name)
+            
+            batch_size = min(_BULK_ADD_BATCH_SIZE, self.client.get_max_batch_size())
+            offset = 0
+            while True:
+                page = self.collection.get(
+                    include=["documents", "metadatas", "embeddings"],
+                    limit=batch_size,
+                    offset=offset
+                )
+                if not page["ids"]:
+                    break
+                rebuilt.add(
+                    ids=page["ids"],
+                    documents=page["documents"],
+                    metadatas=page["metadatas"],
+                    embeddings=page["embeddings"]
+                )
+                offset += len(page["ids"])
             
-            logger.info("Document added to knowledge base", 
-                       document_id=document_id,
-                       source=source,
-                       content_length=len(text))
-            return document_id
+            # Move the original aside before the copy takes its name, so no step loses data
+            self.collection.modify(name=previous_name)
+            rebuilt.modify(name=self.collection_name)
+            self.collection = rebuilt
+            self.client.delete_collection(name=previous_name)
+            
+            logger.info("Knowledge base collection rebuilt with cosine distance",
+                       collection=self.collection_name,
+                       document_count=offset)
+            
+        except Exception as e:
+            logger.error("Failed to rebuild knowledge base collection; similarity scores will be off",
+                        collection=self.collection_name,
+                        previous_space=previous_space,
+                        error=str(e))
+    
+    def add_document(
+        self,
+        text: str,
+        source: str,
+        filepath: Optional[str] = None,
+        embedding: Optional[Sequence[float]] = None
+    ) -> str:
+        """Add a single document, optionally with a pre-computed embedding, returning its id."""
+        embeddings = None if embedding is None else [np.asarray(embedding, dtype=np.float32).tolist()]
+        try:
+            document = (text, source, filepath) if filepath else (text, source)
+            return self._store_documents([document], embeddings)[0]
             
         except Exception as e:
             logger.error("Failed to add document to knowledge base", 
@@ -64,6 +246,107 @@ class KnowledgeBaseManager:
                         error=str(e))
             raise
     
+    def batch_add_documents(self, documents: Sequence[Tuple[str, ...]]) -> List[str]:
+        """Add (text, source[, filepath]) documents in one insert, returning one id per document."""
+        if not documents:
+            return []
+        
+        try:
+            return self._store_documents(documents)
+            
+        except Exception as e:
+            logger.error("Failed to add documents to knowledge base", 
+                        document_count=len(documents), 
+                        error=str(e))
+            raise
+    
+    def _store_documents(
+        self,
+        documents: Sequence[Tuple[str, ...]],
+        embeddings: Optional[PyEmbeddings] = None
+    ) -> List[str]:
+        """Store documents, returning one id per document (the stored id for those kept as-is).
+        
+        Documents with a filepath are keyed by it: an unchanged file keeps its entry and
+        an edited one is updated in place. Documents without one are skipped when they
+        near-duplicate a stored document or one accepted earlier in the batch.
+        """
+        filepaths = [doc[2] if len(doc) > 2 else None for doc in documents]
+        stored = self._stored_files([filepath for filepath in filepaths if filepath])
+        
+        result_ids = [""] * len(documents)
+        updated: Dict[int, str] = {}
+        stale_ids: List[str] = []
+        pending: List[int] = []
+        for i, (document, filepath) in enumerate(zip(documents, filepaths)):
+            entries = stored.pop(filepath, []) if filepath else []
+            if entries:
+                # Keep the entry holding the current content, if any, and drop other copies
+                keep_id, keep_text = next((entry for entry in entries if entry[1] == document[0]), entries[0])
+                stale_ids.extend(entry_id for entry_id, _ in entries if entry_id != keep_id)
+                if keep_text == document[0]:
+                    result_ids[i] = keep_id
+                    continue
+                updated[i] = keep_id
+            pending.append(i)
+        
+        # Embed only new and edited documents, once for both the duplicate check and the write
+        if embeddings is None:
+            embeddings = [[] for _ in documents]
+            if pending:
+                for i, vector in zip(pending, self._embed_documents([documents[i][0] for i in pending])):
+                    embeddings[i] = vector
+        
+        loose = [i for i in pending if not filepaths[i]]
+        duplicates = dict(zip(loose, self._find_duplicates([embeddings[i] for i in loose]))) if loose else {}
+        unit_vectors = dict(zip(loose, _unit_rows([embeddings[i] for i in loose]))) if loose else {}
+        accepted: List[int] = []
+        
+        new: List[int] = []
+        for i in pending:
+            if i in updated:
+                result_ids[i] = updated[i]
+                continue
+            
+            existing_id = duplicates.get(i)
+            # Also drop documents that near-duplicate one accepted earlier in this batch
+            if i in unit_vectors and not existing_id and accepted:
+                similarities = np.stack([unit_vectors[j] for j in accepted]) @ unit_vectors[i]
+                best = int(np.argmax(similarities))
+                if similarities[best] >= _DUPLICATE_SIMILARITY_THRESHOLD:
+                    existing_id = result_ids[accepted[best]]
+            
+            if existing_id:
+                logger.info("Near-duplicate document skipped",
+                           existing_id=existing_id,
+                           source=documents[i][1])
+                result_ids[i] = existing_id
+                continue
+            
+            result_ids[i] = _next_document_id()
+            new.append(i)
+            if i in unit_vectors:
+                accepted.append(i)
+        
+        if stale_ids:
+            self.collection.delete(ids=stale_ids)
+        for write, indices in ((self.collection.add, new), (self.collection.upsert, list(updated))):
+            if indices:
+                write(
+                    documents=[documents[i][0] for i in indices],
+                    metadatas=[{"source": documents[i][1], "filepath": filepaths[i] or documents[i][1]} for i in indices],
+                    ids=[result_ids[i] for i in indices],
+                    embeddings=[embeddings[i] for i in indices]
+                )
+        
+        if new or updated or stale_ids:
+            self._invalidate_search_cache()
+            logger.info("Documents added to knowledge base", 
+                       added=len(new),
+                       updated=len(updated),
+                       removed_copies=len(stale_ids))
+        return result_ids
+    
     def bulk_add_from_directory(
         self, 
         directory_path: str,
@@ -85,11 +368,27 @@ class KnowledgeBaseManager:
                 pattern = "**/*"
             else:
                 pattern = "*"
-                
+            
+            documents: List[Tuple[str, str, str]] = []
             for filepath in directory.glob(pattern):
                 if filepath.is_file() and any(str(filepath).endswith(ext) for ext in extensions):
-                    if self._process_file(filepath):
-                        files_processed += 1
+                    content = self._read_file(filepath)
+                    if content:
+                        # Use filename as source
+                        documents.append((content, filepath.name, str(filepath)))
+            
+            # Insert in bounded batches; a failing batch is logged and skipped
+            batch_size = min(_BULK_ADD_BATCH_SIZE, self.client.get_max_batch_size())
+            for start in range(0, len(documents), batch_size):
+                batch = documents[start:start + batch_size]
+                try:
+                    files_processed += len(self.batch_add_documents(batch))
+                except Exception as e:
+                    logger.error("Error adding document batch, skipping it", 
+                                directory=directory_path,
+                                first_file=batch[0][2],
+                                batch_size=len(batch),
+                                error=str(e))
             
             logger.info("Bulk document processing completed", 
                        directory=directory_path,
@@ -102,74 +401,99 @@ class KnowledgeBaseManager:
                         error=str(e))
             raise
     
-    def _process_file(self, filepath: Path) -> bool:
-        """Process a single file and add it to the knowledge base."""
+    def _embed_documents(self, texts: List[str]) -> PyEmbeddings:
+        """Embed documents once so the vectors can be reused for querying and inserting."""
+        return [np.asarray(vector, dtype=np.float32).tolist() for vector in self.embedding_function(texts)]
+    
+    def _find_duplicates(self, embeddings: PyEmbeddings) -> List[Optional[str]]:
+        """Return, for each embedding, the id of an existing near-duplicate document or None."""
+        try:
+            results = self.collection.query(
+                query_embeddings=embeddings,
+                n_results=1
+            )
+        except Exception as e:
+            logger.warning("Duplicate check failed, adding documents anyway", error=str(e))
+            return [None] * len(embeddings)
+        
+        duplicates: List[Optional[str]] = []
+        for ids, distances in zip(results["ids"], results["distances"] or []):
+            if ids and 1 - distances[0] >= _DUPLICATE_SIMILARITY_THRESHOLD:
+                duplicates.append(ids[0])
+            else:
+                duplicates.append(None)
+        return duplicates
+    
+    def _stored_files(self, filepaths: List[str]) -> Dict[str, List[Tuple[str, str]]]:
+        """Map each filepath already in the collection to its stored (id, content) entries."""
+        if not filepaths:
+            return {}
+        
+        results = self.collection.get(
+            where=cast(Where, {"filepath": {"$in": list(filepaths)}}),
+            include=["documents", "metadatas"]
+        )
+        stored: Dict[str, List[Tuple[str, str]]] = {}
+        for document_id, document, metadata in zip(results["ids"], results["documents"] or [], results["metadatas"] or []):
+            stored.setdefault(str(metadata["filepath"]), []).append((document_id, document))
+        return stored
+    
+    def _read_file(self, filepath: Path) -> Optional[str]:
+        """Read a file's stripped content, or None if it is empty or unreadable."""
         try:
             with open(filepath, 'r', encoding='utf-8') as file:
                 content = file.read().strip()
             
             if not content:
                 logger.warning("Empty file skipped", filepath=str(filepath))
-                return False
+                return None
             
-            # Use filename as source
-            source = filepath.name
-            
-            self.add_document(
-                text=content,
-                source=source,
-                filepath=str(filepath)
-            )
-            
-            return True
+            return content
             
         except Exception as e:
-            logger.error("Error processing file", 
+            logger.error("Error reading file", 
                         filepath=str(filepath), 
                         error=str(e))
-            return False
+            return None
     
     def search(self, query: str, max_results: int = 3, similarity_threshold: float = 0.7) -> List[Dict[str, Any]]:
         """Search for similar documents in the knowledge base."""
+        cache_key = (query, max_results, similarity_threshold)
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            self._search_cache.move_to_end(cache_key)
+            logger.debug("Knowledge base search served from cache", query=query)
+            return list(cached)
+        
         try:
+            # Reuse results of an earlier, semantically equivalent query
+            query_embedding = self._embed_query(query)
+            cached = self._semantic_lookup(query_embedding, max_results, similarity_threshold)
+            if cached is not None:
+                logger.debug("Knowledge base search served from semantic cache", query=query)
+                self._cache_search(cache_key, cached)
+                return list(cached)
+            
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=[query_embedding.tolist()],
                 n_results=max_results
             )
             
-            if not results["documents"][0]:
+            documents = results["documents"]
+            if not documents or not documents[0]:
                 logger.info("No matching documents found", query=query)
+                self._cache_search(cache_key, [], query_embedding)
                 return []
             
-            # Format results
-            formatted_results = []
-            
-            for i, (doc_id, document, distance) in enumerate(zip(
-                results["ids"][0],
-                results["documents"][0], 
-                results["distances"][0]
-            )):
-                # Convert distance to similarity (lower distance = higher similarity)
-                similarity_score = 1 - distance  # Convert distance to similarity
-                metadata = results["metadatas"][0][i] if results["metadatas"] else {}
-                
-                # Include all results, let the caller decide on filtering
-                if similarity_score >= similarity_threshold:
-                    formatted_results.append({
-                        "id": doc_id,
-                        "content": document,
-                        "source": metadata.get("source", "Unknown"),
-                        "filepath": metadata.get("filepath", ""),
-                        "similarity": round(similarity_score, 4),
-                        "distance": round(distance, 4)
-                    })
+            formatted_results = self._format_results(results, 0, similarity_threshold)
             
             logger.info("Knowledge base search completed", 
                        query=query,
-                       total_results=len(results["documents"][0]),
+                       total_results=len(documents[0]),
                        filtered_results=len(formatted_results),
                        threshold=similarity_threshold)
             
+            self._cache_search(cache_key, formatted_results, query_embedding)
             return formatted_results
             
         except Exception as e:
@@ -178,6 +502,148 @@ class KnowledgeBaseManager:
                         error=str(e))
             return []
     
+    def batch_search(
+        self,
+        queries: List[str],
+        max_results: int = 3,
+        similarity_threshold: float = 0.7
+    ) -> List[List[Dict[str, Any]]]:
+        """Search for several queries at once, returning one result list per query."""
+        batch_results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        misses: List[int] = []
+        
+        for i, query in enumerate(queries):
+            cache_key = (query, max_results, similarity_threshold)
+            cached = self._search_cache.get(cache_key)
+            if cached is not None:
+                self._search_cache.move_to_end(cache_key)
+                batch_results[i] = list(cached)
+            else:
+                misses.append(i)
+        
+        if not misses:
+            return batch_results
+        
+        try:
+            # Embed every uncached query at once, then reuse semantically equivalent results
+            pending: List[Tuple[int, np.ndarray]] = []
+            for i, query_embedding in zip(misses, self._embed_queries([queries[i] for i in misses])):
+                cached = self._semantic_lookup(query_embedding, max_results, similarity_threshold)
+                if cached is not None:
+                    self._cache_search((queries[i], max_results, similarity_threshold), cached)
+                    batch_results[i] = list(cached)
+                else:
+                    pending.append((i, query_embedding))
+            
+            if pending:
+                # Query every remaining text in a single round-trip
+                results = self.collection.query(
+                    query_embeddings=[query_embedding.tolist() for _, query_embedding in pending],
+                    n_results=max_results
+                )
+                
+                for row, (i, query_embedding) in enumerate(pending):
+                    formatted_results = self._format_results(results, row, similarity_threshold)
+                    self._cache_search((queries[i], max_results, similarity_threshold), formatted_results, query_embedding)
+                    batch_results[i] = formatted_results
+            
+            logger.info("Knowledge base batch search completed", 
+                       queries=len(queries),
+                       cache_misses=len(misses),
+                       chroma_queries=len(pending),
+                       threshold=similarity_threshold)
+            return batch_results
+            
+        except Exception as e:
+            logger.error("Error batch searching knowledge base", 
+                        queries=len(queries), 
+                        error=str(e))
+            return [[] for _ in queries]
+    
+    def _format_results(self, results: QueryResult, row: int, similarity_threshold: float) -> List[Dict[str, Any]]:
+        """Format one row of a ChromaDB query result, dropping matches below the threshold."""
+        if not results["documents"] or not results["distances"] or not results["documents"][row]:
+            return []
+        
+        # Convert distances to similarities in one pass (lower distance = higher similarity)
+        distances = np.asarray(results["distances"][row], dtype=float)
+        similarities = 1.0 - distances
+        keep = np.nonzero(similarities >= similarity_threshold)[0].tolist()
+        
+        rounded_similarities = np.round(similarities, 4).tolist()
+        rounded_distances = np.round(distances, 4).tolist()
+        ids = results["ids"][row]
+        documents = results["documents"][row]
+        metadatas = results["metadatas"][row] if results["metadatas"] else None
+        
+        # Format results, preserving ChromaDB's ranking order
+        formatted_results = []
+        for i in keep:
+            metadata = metadatas[i] if metadatas else {}
+            formatted_results.append({
+                "id": ids[i],
+                "content": documents[i],
+                "source": metadata.get("source", "Unknown"),
+                "filepath": metadata.get("filepath", ""),
+                "similarity": rounded_similarities[i],
+                "distance": rounded_distances[i]
+            })
+        return formatted_results
+    
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Embed a query as a unit-length vector."""
+        embedding: np.ndarray = self._embed_queries([query])[0]
+        return embedding
+    
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed queries in one call, as a matrix of unit-length rows."""
+        return _unit_rows(self.embedding_function(queries))
+    
+    def _semantic_lookup(
+        self,
+        query_embedding: np.ndarray,
+        max_results: int,
+        similarity_threshold: float
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return cached results for the closest earlier query, if it is similar enough."""
+        candidates = [
+            (key, entry) for key, entry in self._semantic_cache.items()
+            if key[1:] == (max_results, similarity_threshold)
+        ]
+        if not candidates:
+            return None
+        
+        # Cosine similarity against every cached query at once (embeddings are unit length)
+        scores = np.stack([entry[0] for _, entry in candidates]) @ query_embedding
+        best = int(np.argmax(scores))
+        if scores[best] < _SEMANTIC_CACHE_SIMILARITY:
+            return None
+        
+        key, (_, results) = candidates[best]
+        self._semantic_cache.move_to_end(key)
+        return results
+    
+    def _cache_search(
+        self,
+        cache_key: Tuple[str, int, float],
+        results: List[Dict[str, Any]],
+        query_embedding: Optional[np.ndarray] = None
+    ) -> None:
+        """Store search results, evicting the least recently used entries when full."""
+        self._search_cache[cache_key] = list(results)
+        if len(self._search_cache) > _SEARCH_CACHE_SIZE:
+            self._search_cache.popitem(last=False)
+        
+        if query_embedding is not None:
+            self._semantic_cache[cache_key] = (query_embedding, list(results))
+            if len(self._semantic_cache) > _SEMANTIC_CACHE_SIZE:
+                self._semantic_cache.popitem(last=False)
+    
+    def _invalidate_search_cache(self) -> None:
+        """Drop cached search results after the collection changes."""
+        self._search_cache.clear()
+        self._semantic_cache.clear()
+    
     def get_collection_info(self) -> Dict[str, Any]:
         """Get information about the knowledge base collection."""
         try:
@@ -196,12 +662,9 @@ class KnowledgeBaseManager:
         try:
             # Delete the collection and recreate it
             self.client.delete_collection(name=self.collection_name)
+            self._invalidate_search_cache()
             
-            self.collection = self.client.get_or_create_collection(
-                name=self.collection_name,
-                embedding_function=self.embedding_function,
-                metadata={"description": "AI OnCall knowledge base documents"}
-            )
+            self.collection = self._get_or_create_collection(self.collection_name)
             
             logger.info("Knowledge base cleared", collection=self.collection_name)
             
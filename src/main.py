@@ -2,11 +2,13 @@
 import asyncio
 import uuid
 from datetime import datetime
+from time import perf_counter
+from typing import Optional, Tuple
 import uvicorn
 from fastapi import FastAPI, HTTPException, Request
 from slack_bolt.app.async_app import AsyncApp
 from slack_bolt.adapter.fastapi.async_handler import AsyncSlackRequestHandler
-from src.utils.config import config
+from src.utils.config import AppConfig, config
 from src.utils.logging import get_logger
 from src.data.models import MessageRequest, MessageResponse, HealthResponse, MessageContext
 from src.core.message_processor import MessageProcessor
@@ -17,10 +19,12 @@ logger = get_logger(__name__)
 # Knowledge base initialization
 try:
     from src.knowledge.kb_manager import KnowledgeBaseManager
-    knowledge_base = KnowledgeBaseManager()
+    knowledge_base = KnowledgeBaseManager(persist_directory=config.chroma_persist_directory)
     
     # Load documents from knowledge-base folder at startup
     try:
+        # Counts every readable file, including ones already stored by an earlier run,
+        # so zero means the folder really has no documents
         files_processed = knowledge_base.bulk_add_from_directory("knowledge-base")
         if files_processed > 0:
             logger.info("Knowledge base initialized successfully", 
@@ -39,28 +43,29 @@ except ImportError:
 # Initialize message processor
 message_processor = MessageProcessor()
 
-# Initialize Slack app if credentials are configured
-slack_app: AsyncApp | None = None
-slack_handler: AsyncSlackRequestHandler | None = None
-slack_adapter: SlackAdapter | None = None
-
-if config.slack_bot_token:
+def init_slack(cfg: AppConfig) -> Tuple[Optional[AsyncApp], Optional[AsyncSlackRequestHandler], Optional[SlackAdapter]]:
+    """Build the Slack app, webhook handler and adapter if credentials are configured."""
+    if not cfg.slack_bot_token:
+        logger.warning("Slack credentials not configured, Slack integration will be disabled")
+        return None, None, None
+    
     logger.info("Initializing Slack app", 
-                socket_mode=config.slack_socket_mode,
-                channel_id=config.slack_channel_id)
+                socket_mode=cfg.slack_socket_mode,
+                channel_id=cfg.slack_channel_id)
     
-    slack_app = AsyncApp(
-        token=config.slack_bot_token,
-        signing_secret=config.slack_signing_secret if config.slack_signing_secret else None,
+    bolt_app = AsyncApp(
+        token=cfg.slack_bot_token,
+        signing_secret=cfg.slack_signing_secret if cfg.slack_signing_secret else None,
         process_before_response=True
     )
     
-    if not config.slack_socket_mode:
-        slack_handler = AsyncSlackRequestHandler(slack_app)
+    # Socket Mode receives events over the websocket, so no webhook handler is needed
+    handler = None if cfg.slack_socket_mode else AsyncSlackRequestHandler(bolt_app)
     
-    slack_adapter = SlackAdapter()
-else:
-    logger.warning("Slack credentials not configured, Slack integration will be disabled")
+    return bolt_app, handler, SlackAdapter()
+
+# Initialize Slack app if credentials are configured
+slack_app, slack_handler, slack_adapter = init_slack(config)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -90,7 +95,7 @@ async def health_check():
 @app.post("/process-message", response_model=MessageResponse)
 async def process_message(request: MessageRequest):
     """Process an incoming message from any channel."""
-    start_time = datetime.now()
+    start_time = perf_counter()
     logger.info("Processing message request", channel_type=request.channel_type)
     
     context = MessageContext(
@@ -105,7 +110,7 @@ async def process_message(request: MessageRequest):
     
     try:
         result = await message_processor.process_message(context)
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        processing_time = int((perf_counter() - start_time) * 1000)
         
         return MessageResponse(
             response_text=result.response,
@@ -119,7 +124,7 @@ async def process_message(request: MessageRequest):
             error_message=None
         )
     except Exception as e:
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        processing_time = int((perf_counter() - start_time) * 1000)
         logger.exception("Error processing message")
         
         return MessageResponse(
@@ -19,6 +19,8 @@ class AppConfig(BaseSettings):
     slack_app_token: str = ""
     slack_socket_mode: bool = False
     slack_channel_id: str = ""
+    # Knowledge Base Configuration
+    chroma_persist_directory: str = "chroma_db"
     # Workflow Configuration
     workflow_config_path: str = "./config/workflows/"
     default_workflow: str = "general"
@@ -0,0 +1,131 @@
+"""Shared pytest fixtures."""
+import copy
+import functools
+import tempfile
+import zlib
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from fastapi.testclient import TestClient
+import src.knowledge.kb_manager as kb_manager_module
+from src.utils.config import config
+
+
+class OfflineEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Deterministic per-text vectors, so tests never download or load the ONNX model."""
+    
+    def __init__(self):
+        pass
+    
+    def __call__(self, input: Documents) -> Embeddings:
+        return [np.random.default_rng(zlib.crc32(text.encode())).standard_normal(64).astype(np.float32) for text in input]
+    
+    @staticmethod
+    def name():
+        return "offline-test"
+    
+    def get_config(self):
+        return {}
+    
+    @staticmethod
+    def build_from_config(config):
+        return OfflineEmbeddingFunction()
+
+
+# Each worker builds the app's knowledge base in its own throwaway directory,
+# so test runs never write to ./chroma_db or race each other's inserts, and
+# loads ./knowledge-base with the offline embedder instead of the real model
+_KB_DIR = tempfile.TemporaryDirectory(prefix="ai-oncall-kb-", ignore_cleanup_errors=True)
+config.chroma_persist_directory = _KB_DIR.name
+kb_manager_module._EMBED_FN_CACHE = OfflineEmbeddingFunction()
+
+import src.main  # noqa: E402  # warm the app import once per worker, before any test is timed
+from src.core.message_processor import MessageProcessor  # noqa: E402
+from src.data.models import MessageContext  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    """FastAPI test client, started once per session."""
+    with TestClient(src.main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def json_headers():
+    """Headers for posting request bodies that test modules pre-serialize once at import."""
+    return {"content-type": "application/json"}
+
+
+@pytest.fixture(scope="class")
+def processor():
+    """MessageProcessor shared by a test class, built with a mocked OpenAI client."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr('src.core.message_processor.OpenAIClient', lambda *args, **kwargs: AsyncMock())
+        shared = MessageProcessor()
+    return shared
+
+
+class FakeAIClient:
+    """Stand-in for OpenAIClient that returns the canned classification for each message."""
+    
+    def __init__(self, responses):
+        self._responses = responses
+    
+    async def classify_message(self, message, *args, **kwargs):
+        return self._responses[message]
+
+
+@pytest.fixture
+def fake_ai(processor, monkeypatch):
+    """Factory that swaps a FakeAIClient, keyed by message text, into the shared processor."""
+    def _make(responses):
+        fake = FakeAIClient(responses)
+        monkeypatch.setattr(processor, '_openai_client', fake)
+        return fake
+    return _make
+
+
+@pytest.fixture(scope="session")
+def make_context():
+    """Factory for MessageContext objects that skips pydantic validation."""
+    def _make(**overrides):
+        fields = {"user_id": "U123", "channel_id": "C456", "channel_type": "slack", "message_text": "test message"}
+        fields.update(overrides)
+        return MessageContext.model_construct(**fields)
+    return _make
+
+
+def _to_namespace(value):
+    """Recursively convert dicts (and lists of dicts) into SimpleNamespace objects."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(item) for item in value]
+    return value
+
+
+@pytest.fixture(scope="session")
+def openai_response_template():
+    """Shape of an OpenAI chat completion response, as read by OpenAIClient."""
+    return {
+        "choices": [{"message": {"content": '{"type": "support_request", "urgency": "medium"}'}}],
+        "usage": {"total_tokens": 100},
+        "model": "gpt-4"
+    }
+
+
+@pytest.fixture(scope="session")
+def make_openai_response(openai_response_template):
+    """Factory for chat completion responses, cached per (content, total_tokens)."""
+    @functools.lru_cache(maxsize=None)
+    def _make(content=None, total_tokens=None):
+        response = copy.deepcopy(openai_response_template)
+        if content is not None:
+            response["choices"][0]["message"]["content"] = content
+        if total_tokens is not None:
+            response["usage"]["total_tokens"] = total_tokens
+        return _to_namespace(response)
+    return _make
@@ -0,0 +1,40 @@
+"""Integration tests for API endpoints over an in-process ASGI transport."""
+import asyncio
+import httpx
+from unittest.mock import AsyncMock
+import src.main
+from src.data.models import ProcessingResult
+
+_SUPPORT_REQUEST = b'{"message": "I need help with my login"}'
+_DEPLOYMENT_REQUEST = b'{"message": "how do I deploy to production?"}'
+
+
+class TestEndpointsAsync:
+    """Test API endpoints concurrently on one event loop."""
+    
+    async def test_endpoints_respond_concurrently(self, monkeypatch, json_headers):
+        """Test independent endpoint requests can be served concurrently."""
+        # Mock message processing so the requests only exercise the API layer
+        mock_process = AsyncMock(side_effect=[
+            ProcessingResult(response="Ticket created", classification="support_request", confidence=0.7),
+            ProcessingResult(response="Deployment guide", classification="deployment_help", confidence=0.9),
+        ])
+        monkeypatch.setattr(src.main.message_processor, "process_message", mock_process)
+        
+        transport = httpx.ASGITransport(app=src.main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            root, health, support, deployment = await asyncio.gather(
+                ac.get("/"),
+                ac.get("/health"),
+                ac.post("/process-message", content=_SUPPORT_REQUEST, headers=json_headers),
+                ac.post("/process-message", content=_DEPLOYMENT_REQUEST, headers=json_headers),
+            )
+        
+        assert root.status_code == 200
+        assert health.status_code == 200
+        assert support.status_code == 200
+        assert deployment.status_code == 200
+        assert mock_process.await_count == 2
+        assert {support.json()["classification_type"], deployment.json()["classification_type"]} == {
+            "support_request", "deployment_help"
+        }
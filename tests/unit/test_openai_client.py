@@ -1,116 +1,120 @@
 """Unit tests for OpenAI client."""
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock
 from src.ai.openai_client import OpenAIClient
 
+# One AsyncOpenAI stand-in for the module, reset before every test
+_MOCK_CLIENT = AsyncMock()
+
+# Raised as-is by the error-path test, without AsyncMock side-effect dispatch
+_HTTP_ERROR = Exception("HTTP 500 Error")
+
+# Workflow config for prompt building; read-only, so shared by reference
+_TEST_FLOW_CONFIG = {
+    "workflows": [
+        {
+            "trigger_conditions": {
+                "classification_type": "incident",
+                "severity": ["high", "critical"]
+            }
+        },
+        {
+            "trigger_conditions": {
+                "classification_type": "knowledge_query",
+                "urgency": ["low", "medium"]
+            }
+        }
+    ]
+}
+
+
+async def _raise_http_error(*args, **kwargs):
+    raise _HTTP_ERROR
+
+
+@pytest.fixture(scope="class")
+def openai_client():
+    """OpenAIClient built once per test class; config and flow.yaml are read a single time."""
+    return OpenAIClient()
+
+
+@pytest.fixture(autouse=True)
+def mock_client(openai_client, monkeypatch):
+    """Point the shared client at the AsyncOpenAI mock with its state cleared."""
+    _MOCK_CLIENT.reset_mock(side_effect=True)
+    monkeypatch.setattr(openai_client, '_client', _MOCK_CLIENT)
+    return _MOCK_CLIENT
+
 
 class TestOpenAIClient:
     """Test OpenAI client core functionality."""
     
-    @pytest.mark.asyncio
-    @patch('src.ai.openai_client.AsyncOpenAI')
-    async def test_classify_message_success(self, mock_openai_class):
+    async def test_classify_message_success(self, openai_client, mock_client, make_openai_response):
         """Test successful message classification."""
-        # Mock the AsyncOpenAI client
-        mock_client = AsyncMock()
-        mock_openai_class.return_value = mock_client
-        
         # Mock the completion response
-        mock_response = MagicMock()
-        mock_response.choices = [MagicMock()]
-        mock_response.choices[0].message.content = '{"type": "incident", "severity": "high", "confidence": 0.9}'
-        mock_response.usage.total_tokens = 100
-        mock_response.model = "gpt-4"
+        mock_response = make_openai_response('{"type": "incident", "severity": "high", "confidence": 0.9}')
         
-        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        mock_client.chat.completions.create.return_value = mock_response
         
-        client = OpenAIClient()
-        result = await client.classify_message("server is down")
+        result = await openai_client.classify_message("server is down")
         
         assert result["type"] == "incident"
         assert result["severity"] == "high"
         assert result["confidence"] == 0.9
     
-    @pytest.mark.asyncio
-    @patch('src.ai.openai_client.AsyncOpenAI')
-    async def test_classify_message_json_parse_error(self, mock_openai_class):
+    async def test_classify_message_json_parse_error(self, openai_client, mock_client, make_openai_response):
         """Test handling of malformed JSON response."""
-        # Mock the AsyncOpenAI client
-        mock_client = AsyncMock()
-        mock_openai_class.return_value = mock_client
-        
         # Mock response with invalid JSON
-        mock_response = MagicMock()
-        mock_response.choices = [MagicMock()]
-        mock_response.choices[0].message.content = "not valid json"
-        mock_response.usage.total_tokens = 50
-        mock_response.model = "gpt-4"
+        mock_response = make_openai_response("not valid json", total_tokens=50)
         
-        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        mock_client.chat.completions.create.return_value = mock_response
         
-        client = OpenAIClient()
-        result = await client.classify_message("test message")
+        result = await openai_client.classify_message("test message")
         
         # Should return fallback response
         assert result["type"] == "unknown"
         assert result["severity"] == "unknown"
     
-    @pytest.mark.asyncio
-    @patch('src.ai.openai_client.AsyncOpenAI')
-    async def test_classify_message_http_error(self, mock_openai_class):
+    async def test_classify_message_http_error(self, openai_client, mock_client, monkeypatch):
         """Test handling of HTTP errors."""
-        # Mock the AsyncOpenAI client
-        mock_client = AsyncMock()
-        mock_openai_class.return_value = mock_client
-        
-        # Mock HTTP error
-        mock_client.chat.completions.create = AsyncMock(side_effect=Exception("HTTP 500 Error"))
+        # Fail the completion call with a plain coroutine
+        monkeypatch.setattr(mock_client.chat.completions, "create", _raise_http_error)
         
-        client = OpenAIClient()
-        result = await client.classify_message("test message")
+        result = await openai_client.classify_message("test message")
         
         # Should return fallback response
         assert result["type"] == "unknown"
         assert result["severity"] == "unknown"
     
-    @pytest.mark.asyncio
-    async def test_classify_message_no_client(self):
+    async def test_classify_message_no_client(self, openai_client, monkeypatch):
         """Test behavior when OpenAI client is not configured."""
-        with patch('src.ai.openai_client.config.openai_api_key', None):
-            client = OpenAIClient()
-            result = await client.classify_message("test message")
-            
-            # Should return mock response
-            assert result["type"] == "support_request"
-            assert result["severity"] == "low"
+        monkeypatch.setattr(openai_client, '_client', None)
+        
+        result = await openai_client.classify_message("test message")
+        
+        # Should return mock response
+        assert result["type"] == "support_request"
+        assert result["severity"] == "low"
     
-    def test_build_classification_prompt_with_workflows(self):
+    def test_build_classification_prompt_with_workflows(self, openai_client, monkeypatch):
         """Test dynamic prompt building from workflow config."""
-        # Mock workflow config
-        mock_flow_config = {
-            "workflows": [
-                {
-                    "trigger_conditions": {
-                        "classification_type": "incident",
-                        "severity": ["high", "critical"]
-                    }
-                },
-                {
-                    "trigger_conditions": {
-                        "classification_type": "knowledge_query",
-                        "urgency": ["low", "medium"]
-                    }
-                }
-            ]
-        }
-        
-        client = OpenAIClient()
-        client.flow_config = mock_flow_config
+        monkeypatch.setattr(openai_client, 'flow_config', _TEST_FLOW_CONFIG)
         
-        prompt = client._build_classification_prompt()
+        prompt = openai_client._build_classification_prompt()
         
         # Should contain workflow-specific types
         assert "incident" in prompt
         assert "knowledge_query" in prompt
         assert "high" in prompt
-        assert "critical" in prompt 
\ No newline at end of file
+        assert "critical" in prompt 
+    
+    def test_build_classification_prompt_cached_per_config(self, openai_client, monkeypatch):
+        """Test the prompt is reused until flow_config is replaced."""
+        monkeypatch.setattr(openai_client, 'flow_config', _TEST_FLOW_CONFIG)
+        prompt = openai_client._build_classification_prompt()
+        
+        assert openai_client._build_classification_prompt() is prompt
+        
+        monkeypatch.setattr(openai_client, 'flow_config', {"workflows": []})
+        assert "incident" in openai_client._build_classification_prompt()  # Rebuilt with default types
+        assert openai_client._build_classification_prompt() is not prompt